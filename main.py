@@ -7,9 +7,10 @@ import zipfile
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QLineEdit, QSpinBox, QTextEdit, QFileDialog,
-    QDialog, QDialogButtonBox, QTabWidget, QMessageBox, QGroupBox
+    QDialog, QDialogButtonBox, QTabWidget, QMessageBox, QGroupBox, QComboBox
 )
 from PyQt5.QtCore import QTimer, Qt, pyqtSignal
+from ottopie_profiler import PROFILE_MODES, RunSampler, check_profile_config, profile_call, format_run_stats
 
 # 配置记录文件名称
 CONFIG_RECORD_FILE = "tasks_config.json"
@@ -186,6 +187,48 @@ class ScriptConfigDialog(QDialog):
             "interval_seconds": self.seconds_spin.value()
         }
 
+# ==================================================
+# 对话框：性能分析设置（分析接下来 N 次运行）
+# ==================================================
+class ProfileConfigDialog(QDialog):
+    def __init__(self, config=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("性能分析")
+        self.config = config if config else {}
+
+        layout = QVBoxLayout()
+
+        runs_layout = QHBoxLayout()
+        runs_layout.addWidget(QLabel("分析接下来的运行次数:"))
+        self.runs_spin = QSpinBox()
+        self.runs_spin.setRange(0, 100)
+        self.runs_spin.setSuffix(" 次")
+        profile_runs, profile_mode, _ = check_profile_config(self.config)
+        self.runs_spin.setValue(profile_runs or 1)
+        runs_layout.addWidget(self.runs_spin)
+        layout.addLayout(runs_layout)
+
+        mode_layout = QHBoxLayout()
+        mode_layout.addWidget(QLabel("分析方式:"))
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItems(PROFILE_MODES)
+        self.mode_combo.setCurrentText(profile_mode)
+        mode_layout.addWidget(self.mode_combo)
+        layout.addLayout(mode_layout)
+
+        self.buttonBox = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        self.buttonBox.accepted.connect(self.accept)
+        self.buttonBox.rejected.connect(self.reject)
+        layout.addWidget(self.buttonBox)
+
+        self.setLayout(layout)
+
+    def get_profile_config(self):
+        return {
+            "profile_runs": self.runs_spin.value(),
+            "profile_mode": self.mode_combo.currentText()
+        }
+
 # ==================================================
 # 任务项：封装每个脚本任务（支持插件包与传统脚本）
 # ==================================================
@@ -193,6 +236,8 @@ class TaskWidget(QWidget):
     log_signal = pyqtSignal(str)            # 用于向主窗体发送日志信息
     removed_signal = pyqtSignal(object)       # 用于通知删除任务
     config_changed_signal = pyqtSignal()      # 配置变更后发出
+    # 所有任务都在界面线程中依次执行，共用一个采样线程即可，避免任务数增多时线程数随之增长
+    sampler = RunSampler()
 
     def __init__(self, config, parent=None):
         super().__init__(parent)
@@ -220,6 +265,9 @@ class TaskWidget(QWidget):
         self.update_btn = QPushButton("更新脚本")
         self.update_btn.clicked.connect(self.update_script)
         layout.addWidget(self.update_btn)
+        self.profile_btn = QPushButton("性能分析")
+        self.profile_btn.clicked.connect(self.edit_profile)
+        layout.addWidget(self.profile_btn)
         self.del_btn = QPushButton("删除")
         self.del_btn.clicked.connect(self.delete_self)
         layout.addWidget(self.del_btn)
@@ -296,6 +344,8 @@ class TaskWidget(QWidget):
         dialog = ScriptConfigDialog(self.config, self)
         if dialog.exec_() == QDialog.Accepted:
             new_config = dialog.get_config()
+            # 保留尚未完成的性能分析设置
+            new_config.update({k: v for k, v in self.config.items() if k.startswith("profile_")})
             self.config = new_config
             self.load_script_module()
             self.log("配置已修改")
@@ -303,6 +353,13 @@ class TaskWidget(QWidget):
         else:
             self.log("取消配置修改")
 
+    def edit_profile(self):
+        dialog = ProfileConfigDialog(self.config, self)
+        if dialog.exec_() == QDialog.Accepted:
+            self.config.update(dialog.get_profile_config())
+            self.log("将对接下来 {profile_runs} 次运行进行性能分析（{profile_mode}）".format(**self.config))
+            self.config_changed_signal.emit()
+
     def update_script(self):
         if self.running:
             self.stop()
@@ -343,7 +400,27 @@ class TaskWidget(QWidget):
                 "src": self.config.get("src", ""),
                 "tgt": self.config.get("tgt", "")
             }
-            result = self.script_module.run(params)
+            profile_runs, profile_mode, error = check_profile_config(self.config)
+            if error:
+                # 只提示一次：重置无效的分析设置并保存，之后按未分析方式运行
+                self.log("性能分析配置无效，已重置，本次按未分析方式运行: " + error)
+                self.config["profile_runs"] = 0
+                self.config["profile_mode"] = profile_mode
+                self.config_changed_signal.emit()
+            if profile_runs > 0:
+                # 按需分析：消耗一次计数并保存，分析期间不进行采样
+                self.config["profile_runs"] = profile_runs - 1
+                self.config_changed_signal.emit()
+                label = os.path.splitext(os.path.basename(self.config.get("script_path", "")))[0]
+                result = profile_call(self.script_module.run, params,
+                                      mode=profile_mode,
+                                      label=label, log=self.log)
+            else:
+                self.sampler.begin()
+                try:
+                    result = self.script_module.run(params)
+                finally:
+                    self.log(format_run_stats(self.sampler.end()))
             self.log("任务执行结果: " + str(result))
         except Exception as e:
             self.log("任务执行异常: " + str(e))
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+OttoPie 基准测试工具
+
+用于衡量 FolderSync 同步、插件包加载以及定时器驱动的 run_task 调度开销，
+输出包含百分位统计的 JSON 结果，并可与保存的基线结果对比以发现性能回退。
+
+示例：
+    python ottopie_bench.py                                   # 运行全部场景
+    python ottopie_bench.py --scenario sync_cold sync_noop    # 只运行指定场景
+    python ottopie_bench.py --save-baseline bench_baseline.json
+    python ottopie_bench.py --baseline bench_baseline.json --threshold 10
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import zipfile
+import argparse
+import platform
+import tempfile
+import importlib.util
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FOLDER_SYNC_PLUGIN = os.path.join(BASE_DIR, "FolderSyncPlugin.py")
+
+# 默认结果输出文件
+DEFAULT_OUTPUT_FILE = "bench_results.json"
+# 参与基线对比的统计项
+COMPARE_METRIC = "p50"
+# 与基线不一致时只警告、不阻止对比的参数（只影响样本数量，不影响每次测量的内容）
+SOFT_PARAMS = ("repeat",)
+
+# ==================================================
+# 合成目录树生成
+# ==================================================
+def generate_tree(root, file_count=1000, min_size=1024, max_size=64 * 1024,
+                  size_dist="lognormal", depth=3, seed=0):
+    """
+    在 root 下生成可复现的合成目录树
+
+    :param root: 目录树根路径（不存在时自动创建）
+    :param file_count: 文件总数
+    :param min_size: 最小文件大小（字节）
+    :param max_size: 最大文件大小（字节）
+    :param size_dist: 文件大小分布，可选 "fixed"、"uniform"、"lognormal"
+    :param depth: 目录最大深度（0 表示所有文件都位于根目录）
+    :param seed: 随机种子，相同参数与种子生成完全相同的目录树
+    :return: 生成的文件路径列表
+    """
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    files = []
+    for i in range(file_count):
+        # 每个文件随机放在 0 ~ depth 层的子目录中
+        level = rng.randint(0, depth)
+        parts = ["d{}".format(rng.randint(0, 3)) for _ in range(level)]
+        folder = os.path.join(root, *parts)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, "f{:06d}.bin".format(i))
+        with open(path, "wb") as f:
+            f.write(rng.randbytes(_pick_size(rng, min_size, max_size, size_dist)))
+        files.append(path)
+    return files
+
+def _pick_size(rng, min_size, max_size, size_dist):
+    """按指定分布选取文件大小"""
+    if size_dist == "fixed":
+        return min_size
+    if size_dist == "uniform":
+        return rng.randint(min_size, max_size)
+    if size_dist == "lognormal":
+        # 以 min_size 与 max_size 的几何平均作为中位数，大部分文件较小，少量较大
+        median = (max(min_size, 1) * max_size) ** 0.5
+        size = int(rng.lognormvariate(0, 1) * median)
+        return min(max(size, min_size), max_size)
+    raise ValueError("未知的文件大小分布：" + size_dist)
+
+def mutate_tree(files, changed_percent, seed=0):
+    """
+    修改指定比例的文件内容，并将修改时间推后，保证 FolderSync 会将其识别为需要更新
+
+    :param files: generate_tree() 返回的文件路径列表
+    :param changed_percent: 需要修改的文件百分比（0 ~ 100）
+    :param seed: 随机种子
+    :return: 被修改的文件数
+    """
+    rng = random.Random(seed)
+    count = int(len(files) * changed_percent / 100)
+    mtime = time.time() + 10
+    for path in rng.sample(files, count):
+        with open(path, "r+b") as f:
+            f.write(rng.randbytes(16))
+        os.utime(path, (mtime, mtime))
+    return count
+
+# ==================================================
+# 辅助函数
+# ==================================================
+def load_folder_sync():
+    """以插件方式加载仓库中的 FolderSyncPlugin.py"""
+    spec = importlib.util.spec_from_file_location("bench_folder_sync", FOLDER_SYNC_PLUGIN)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def import_main():
+    """导入 main.py（依赖 PyQt5，仅插件加载与调度场景需要）"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    import main
+    return main
+
+def new_counters():
+    return {"copied": 0, "updated": 0, "deleted": 0, "skipped": 0}
+
+def percentile(samples, pct):
+    """线性插值计算百分位数，samples 需已排序"""
+    if not samples:
+        return 0.0
+    k = (len(samples) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(samples) - 1)
+    return samples[lo] + (samples[hi] - samples[lo]) * (k - lo)
+
+def summarize(samples):
+    """将一组耗时样本（秒）汇总为统计结果"""
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "min": ordered[0],
+        "max": ordered[-1],
+        "mean": sum(ordered) / len(ordered),
+        "p50": percentile(ordered, 50),
+        "p90": percentile(ordered, 90),
+        "p99": percentile(ordered, 99),
+    }
+
+# ==================================================
+# 基准场景：每个场景返回耗时样本列表（秒），准备与清理工作不计入耗时
+# ==================================================
+def bench_sync_cold(args, work_dir):
+    """冷同步：目标文件夹为空，所有文件都需要复制"""
+    plugin = load_folder_sync()
+    src = os.path.join(work_dir, "src")
+    tgt = os.path.join(work_dir, "tgt")
+    generate_tree(src, args.files, args.min_size, args.max_size, args.size_dist, args.depth, args.seed)
+    samples = []
+    for _ in range(args.repeat):
+        if os.path.exists(tgt):
+            shutil.rmtree(tgt)
+        start = time.perf_counter()
+        plugin.sync_folders(src, tgt, new_counters())
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def bench_sync_warm(args, work_dir):
+    """热同步：目标文件夹已同步，源文件夹中有 changed_percent% 的文件发生变化"""
+    plugin = load_folder_sync()
+    src = os.path.join(work_dir, "src")
+    tgt = os.path.join(work_dir, "tgt")
+    files = generate_tree(src, args.files, args.min_size, args.max_size, args.size_dist, args.depth, args.seed)
+    plugin.sync_folders(src, tgt, new_counters())
+    samples = []
+    for i in range(args.repeat):
+        mutate_tree(files, args.changed, args.seed + i + 1)
+        start = time.perf_counter()
+        plugin.sync_folders(src, tgt, new_counters())
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def bench_sync_noop(args, work_dir):
+    """空同步：源与目标完全一致，只有比较开销"""
+    plugin = load_folder_sync()
+    src = os.path.join(work_dir, "src")
+    tgt = os.path.join(work_dir, "tgt")
+    generate_tree(src, args.files, args.min_size, args.max_size, args.size_dist, args.depth, args.seed)
+    plugin.sync_folders(src, tgt, new_counters())
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        plugin.sync_folders(src, tgt, new_counters())
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def bench_plugin_cold_load(args, work_dir):
+    """插件冷加载：每次都重新解压 .ottopie 包并执行入口模块"""
+    main = import_main()
+    package_path = os.path.join(work_dir, "BenchPlugin.ottopie")
+    with zipfile.ZipFile(package_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        zipf.write(FOLDER_SYNC_PLUGIN, arcname="FolderSyncPlugin.py")
+        zipf.writestr("plugin.json", json.dumps({
+            "name": "BenchPlugin",
+            "version": "1.0.0",
+            "entry_point": "FolderSyncPlugin.py",
+            "description": "benchmark"
+        }))
+    module_name = "plugin_" + os.path.basename(package_path).replace(".", "_")
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        _, temp_dir = main.load_plugin_from_package(package_path)
+        samples.append(time.perf_counter() - start)
+        sys.modules.pop(module_name, None)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return samples
+
+def prepare_noop_task(work_dir):
+    """准备调度场景共用的 Qt 环境与空任务脚本，返回 (main 模块, QApplication, 脚本路径)"""
+    main = import_main()
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication([])
+    script_path = os.path.join(work_dir, "bench_noop.py")
+    with open(script_path, "w", encoding="utf-8") as f:
+        f.write("def run(params):\n    return 'ok'\n")
+    return main, app, script_path
+
+def bench_schedule(task_runs, args, work_dir):
+    """
+    单任务调度开销：以 0 毫秒间隔启动一个 TaskWidget 的定时器，
+    统计经由 QTimer -> run_task -> run(params) 路径连续执行 task_runs 次空任务的总耗时。
+    只反映每次派发的开销，不涉及多个任务同时调度。
+    """
+    main, app, script_path = prepare_noop_task(work_dir)
+    from PyQt5.QtCore import QEventLoop
+
+    widget = main.TaskWidget({"script_path": script_path})
+    logs = []
+    widget.log_signal.connect(logs.append)
+    samples = []
+    for _ in range(args.repeat):
+        loop = QEventLoop()
+        fired = [0]
+
+        def on_timeout():
+            fired[0] += 1
+            if fired[0] >= task_runs:
+                widget.timer.stop()
+                loop.quit()
+
+        widget.timer.timeout.connect(on_timeout)
+        start = time.perf_counter()
+        widget.timer.start(0)
+        loop.exec_()
+        samples.append(time.perf_counter() - start)
+        widget.timer.timeout.disconnect(on_timeout)
+        logs.clear()
+    widget.delete_self()
+    app.processEvents()
+    return samples
+
+def bench_schedule_concurrent(task_count, args, work_dir):
+    """
+    多任务调度开销：创建 task_count 个 TaskWidget 并同时启动各自的定时器，
+    统计所有任务都经由定时器执行一次空任务所需的总耗时（任务创建不计入耗时）
+    """
+    main, app, script_path = prepare_noop_task(work_dir)
+    from PyQt5.QtCore import QEventLoop
+
+    widgets = [main.TaskWidget({"script_path": script_path}) for _ in range(task_count)]
+    logs = []
+    for widget in widgets:
+        widget.log_signal.connect(logs.append)
+    samples = []
+    for _ in range(args.repeat):
+        loop = QEventLoop()
+        pending = [task_count]
+
+        def make_handler(widget):
+            def on_timeout():
+                widget.timer.stop()
+                pending[0] -= 1
+                if pending[0] == 0:
+                    loop.quit()
+            return on_timeout
+
+        handlers = [(widget, make_handler(widget)) for widget in widgets]
+        for widget, handler in handlers:
+            widget.timer.timeout.connect(handler)
+        start = time.perf_counter()
+        for widget in widgets:
+            widget.timer.start(0)
+        loop.exec_()
+        samples.append(time.perf_counter() - start)
+        for widget, handler in handlers:
+            widget.timer.timeout.disconnect(handler)
+        logs.clear()
+    for widget in widgets:
+        widget.delete_self()
+        widget.deleteLater()
+    app.processEvents()
+    return samples
+
+SCENARIOS = {
+    "sync_cold": bench_sync_cold,
+    "sync_warm": bench_sync_warm,
+    "sync_noop": bench_sync_noop,
+    "plugin_cold_load": bench_plugin_cold_load,
+    "schedule_1k": lambda args, work_dir: bench_schedule(1000, args, work_dir),
+    "schedule_10k": lambda args, work_dir: bench_schedule(10000, args, work_dir),
+    "schedule_tasks_1k": lambda args, work_dir: bench_schedule_concurrent(1000, args, work_dir),
+    "schedule_tasks_10k": lambda args, work_dir: bench_schedule_concurrent(10000, args, work_dir),
+}
+
+# ==================================================
+# 运行、输出与基线对比
+# ==================================================
+def run_scenarios(args):
+    """依次运行选定场景，返回完整的结果字典"""
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {
+                "files": args.files,
+                "min_size": args.min_size,
+                "max_size": args.max_size,
+                "size_dist": args.size_dist,
+                "depth": args.depth,
+                "changed": args.changed,
+                "repeat": args.repeat,
+                "seed": args.seed,
+            },
+        },
+        "scenarios": {},
+    }
+    for name in args.scenario:
+        print(f"运行场景 {name} ...")
+        work_dir = tempfile.mkdtemp(prefix="ottopie_bench_")
+        try:
+            stats = summarize(SCENARIOS[name](args, work_dir))
+            results["scenarios"][name] = stats
+            print("  p50 {p50:.6f}s  p90 {p90:.6f}s  p99 {p99:.6f}s  ({runs} 次)".format(**stats))
+        except ImportError as e:
+            print(f"  跳过：缺少依赖（{e}）")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+def check_baseline_meta(results, baseline):
+    """
+    检查结果与基线是否可比
+    :return: 参数不一致的列表，每项为 (参数名, 基线值, 当前值)；
+             Python 版本、平台或 SOFT_PARAMS 中的参数不同时只打印警告
+    """
+    meta, base_meta = results["meta"], baseline.get("meta", {})
+    for key, label in (("python", "Python 版本"), ("platform", "平台")):
+        if meta[key] != base_meta.get(key):
+            print(f"警告：{label}与基线不同（{base_meta.get(key)} -> {meta[key]}），结果可能不可比。")
+    base_params = base_meta.get("params", {})
+    mismatches = []
+    for key, value in meta["params"].items():
+        if base_params.get(key) == value:
+            continue
+        if key in SOFT_PARAMS:
+            print(f"警告：参数 {key} 与基线不同（{base_params.get(key)} -> {value}），百分位统计的精度会有差异。")
+        else:
+            mismatches.append((key, base_params.get(key), value))
+    return mismatches
+
+def compare_with_baseline(results, baseline, threshold):
+    """
+    将结果与基线对比
+    :param threshold: 允许的最大变慢百分比，超过即视为回退
+    :return: 回退列表，每项为 (场景名, 基线值, 当前值, 变化百分比)
+    """
+    regressions = []
+    print(f"与基线对比（{COMPARE_METRIC}，阈值 {threshold}%）：")
+    for name, stats in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            print(f"  {name}: 基线中无此场景")
+            continue
+        old, new = base[COMPARE_METRIC], stats[COMPARE_METRIC]
+        change = (new - old) / old * 100 if old else 0.0
+        flag = "回退" if change > threshold else "正常"
+        print(f"  {name}: {old:.6f}s -> {new:.6f}s ({change:+.1f}%) {flag}")
+        if change > threshold:
+            regressions.append((name, old, new, change))
+    for name in baseline.get("scenarios", {}):
+        if name not in results["scenarios"]:
+            print(f"  {name}: 基线中有此场景，但本次未运行")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="OttoPie 基准测试工具")
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help="要运行的场景（默认全部）")
+    parser.add_argument("--files", type=int, default=1000, help="合成目录树的文件数")
+    parser.add_argument("--min-size", type=int, default=1024, help="最小文件大小（字节）")
+    parser.add_argument("--max-size", type=int, default=64 * 1024, help="最大文件大小（字节）")
+    parser.add_argument("--size-dist", choices=["fixed", "uniform", "lognormal"], default="lognormal",
+                        help="文件大小分布")
+    parser.add_argument("--depth", type=int, default=3, help="目录最大深度")
+    parser.add_argument("--changed", type=float, default=10.0, help="热同步场景中变化文件的百分比")
+    parser.add_argument("--repeat", type=int, default=10, help="每个场景的重复次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_FILE, help="JSON 结果输出文件")
+    parser.add_argument("--baseline", help="用于对比的基线 JSON 文件")
+    parser.add_argument("--threshold", type=float, default=10.0, help="判定为回退的变慢百分比")
+    parser.add_argument("--save-baseline", help="将本次结果另存为基线文件")
+    args = parser.parse_args(argv)
+
+    if args.repeat < 1:
+        parser.error("--repeat 必须大于等于 1")
+    if args.files < 1:
+        parser.error("--files 必须大于等于 1")
+    if args.depth < 0:
+        parser.error("--depth 不能为负数")
+    if args.min_size < 0:
+        parser.error("--min-size 不能为负数")
+    if args.min_size > args.max_size:
+        parser.error("--min-size 不能大于 --max-size")
+    if not 0 <= args.changed <= 100:
+        parser.error("--changed 必须在 0 ~ 100 之间")
+    if args.threshold < 0:
+        parser.error("--threshold 不能为负数")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # 先读取基线，避免 --output / --save-baseline 与 --baseline 指向同一文件时基线被覆盖
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = run_scenarios(args)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=4)
+    print(f"结果已保存：{args.output}")
+
+    status = 0
+    if baseline is not None:
+        mismatches = check_baseline_meta(results, baseline)
+        if mismatches:
+            for key, old, new in mismatches:
+                print(f"参数 {key} 与基线不一致：{old} -> {new}")
+            print("测试参数与基线不一致，结果不可比，未进行对比。")
+            status = 2
+        else:
+            regressions = compare_with_baseline(results, baseline, args.threshold)
+            missing = [name for name in baseline.get("scenarios", {}) if name not in results["scenarios"]]
+            if regressions:
+                print(f"发现 {len(regressions)} 个场景性能回退。")
+                status = 1
+            elif missing:
+                print(f"未发现性能回退，但有 {len(missing)} 个基线场景未运行：{', '.join(missing)}")
+            else:
+                print("未发现性能回退。")
+
+    # 对比完成后再保存基线
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.save_baseline)
+        print(f"基线已保存：{args.save_baseline}")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
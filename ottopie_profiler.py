@@ -0,0 +1,235 @@
+"""
+OttoPie 任务性能分析工具
+
+- profile_call()：按需使用 cProfile / tracemalloc 包裹一次 run(params) 调用，
+  结果保存为 .pstats 与内存快照差异文件，并将前 N 项摘要写入日志；
+- RunSampler：常驻的采样器，以极低的 CPU 预算周期性采样任务线程的调用栈，
+  记录每次运行的耗时、CPU 时间与热点函数。
+"""
+import io
+import os
+import sys
+import time
+import pstats
+import itertools
+import cProfile
+import threading
+import tracemalloc
+
+# 性能分析结果输出目录
+PROFILE_OUTPUT_DIR = "profiles"
+# 支持的分析模式
+PROFILE_MODES = ("cprofile", "tracemalloc", "both")
+# 日志中展示的摘要条数
+DEFAULT_TOP_N = 10
+# 进程内递增序号，保证同一秒内多次分析的输出文件名不冲突
+_output_counter = itertools.count(1)
+
+# 采样器默认 CPU 预算（采样线程占用 CPU 时间的比例上限）
+DEFAULT_CPU_BUDGET = 0.005
+# 采样间隔上下限（秒）
+MIN_SAMPLE_INTERVAL = 0.01
+MAX_SAMPLE_INTERVAL = 1.0
+
+# ==================================================
+# 按需分析：cProfile / tracemalloc
+# ==================================================
+def check_profile_config(config):
+    """
+    校验任务配置中的 profile_runs 与 profile_mode（可能来自手工编辑的 tasks_config.json）
+    profile_runs 为 0 时不会进行分析，此时不校验 profile_mode
+    :return: (profile_runs, profile_mode, error)，error 为 None 表示配置有效
+    """
+    runs = config.get("profile_runs", 0)
+    mode = config.get("profile_mode", "cprofile")
+    if isinstance(runs, bool) or not isinstance(runs, int) or runs < 0:
+        return 0, "cprofile", "profile_runs 必须为非负整数，当前值：{!r}".format(runs)
+    if runs == 0:
+        return 0, mode if mode in PROFILE_MODES else "cprofile", None
+    if mode not in PROFILE_MODES:
+        return 0, "cprofile", "profile_mode 必须为 {} 之一，当前值：{!r}".format("、".join(PROFILE_MODES), mode)
+    return runs, mode, None
+
+def profile_call(func, params, mode="cprofile", output_dir=PROFILE_OUTPUT_DIR,
+                 label="task", top_n=DEFAULT_TOP_N, log=print):
+    """
+    在 cProfile 和/或 tracemalloc 下执行 func(params)
+
+    :param func: 被分析的函数，通常为插件的 run
+    :param params: 传给 func 的参数
+    :param mode: "cprofile"、"tracemalloc" 或 "both"
+    :param output_dir: 结果文件输出目录
+    :param label: 结果文件名前缀
+    :param top_n: 日志中展示的摘要条数
+    :param log: 日志输出函数
+    :return: func(params) 的返回值（func 抛出的异常会在保存结果后继续抛出）；
+             结果文件写入失败只记录日志，不影响任务本身
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError("未知的性能分析模式：" + str(mode))
+    use_cprofile = mode in ("cprofile", "both")
+    use_tracemalloc = mode in ("tracemalloc", "both")
+
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+    except OSError as e:
+        log("无法创建性能分析输出目录，本次不进行分析: " + str(e))
+        return func(params)
+    prefix = os.path.join(output_dir, "{}_{}_{:03d}_{}_{}".format(
+        label, time.strftime("%Y%m%d_%H%M%S"), int(time.time() * 1000) % 1000,
+        os.getpid(), next(_output_counter)))
+    if use_cprofile and use_tracemalloc:
+        log("注意：both 模式下 cProfile 与 tracemalloc 同时运行，耗时数据会被显著放大，仅供参考")
+
+    profiler = cProfile.Profile() if use_cprofile else None
+    started_tracemalloc = False
+    snapshot_before = snapshot_after = None
+    if use_tracemalloc:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracemalloc = True
+        snapshot_before = tracemalloc.take_snapshot()
+
+    try:
+        if profiler:
+            profiler.enable()
+        try:
+            return func(params)
+        finally:
+            # 先停止分析并拍下内存快照，再保存结果，避免保存过程本身计入统计
+            if profiler:
+                profiler.disable()
+            if use_tracemalloc:
+                snapshot_after = tracemalloc.take_snapshot()
+                if started_tracemalloc:
+                    tracemalloc.stop()
+    finally:
+        if use_tracemalloc and snapshot_after is not None:
+            try:
+                _save_tracemalloc_diff(snapshot_before, snapshot_after, prefix + "_tracemalloc.txt", top_n, log)
+            except OSError as e:
+                log("保存 tracemalloc 结果失败: " + str(e))
+        if profiler:
+            try:
+                _save_cprofile(profiler, prefix + ".pstats", top_n, log)
+            except OSError as e:
+                log("保存 cProfile 结果失败: " + str(e))
+
+def _save_cprofile(profiler, path, top_n, log):
+    """保存 .pstats 文件，并按累计耗时输出前 top_n 项"""
+    profiler.dump_stats(path)
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats("cumulative").print_stats(top_n)
+    log("cProfile 结果已保存: " + path)
+    # 跳过 pstats 输出开头的空行与表头之前的说明，只保留统计表
+    lines = stream.getvalue().splitlines()
+    for i, line in enumerate(lines):
+        if line.lstrip().startswith("ncalls"):
+            lines = lines[i:]
+            break
+    for line in lines:
+        if line.strip():
+            log("  " + line.rstrip())
+
+def _save_tracemalloc_diff(before, after, path, top_n, log):
+    """保存两次内存快照的差异，并输出内存增长最多的前 top_n 项"""
+    # 排除分析工具自身的内存分配
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    with open(path, "w", encoding="utf-8") as f:
+        for stat in diff:
+            f.write(str(stat) + "\n")
+    total = sum(stat.size_diff for stat in diff)
+    log("tracemalloc 快照差异已保存: {}（净增长 {:.1f} KiB）".format(path, total / 1024))
+    for stat in diff[:top_n]:
+        log("  " + str(stat))
+
+# ==================================================
+# 常驻采样：低开销记录每次运行的耗时与热点
+# ==================================================
+class RunSampler:
+    """
+    采样线程只在 begin() 与 end() 之间工作，周期性读取目标线程当前执行的函数；
+    每次采样后根据自身 CPU 耗时调整采样间隔，使采样开销不超过 cpu_budget。
+    """
+
+    def __init__(self, cpu_budget=DEFAULT_CPU_BUDGET):
+        self.cpu_budget = cpu_budget
+        self.interval = MIN_SAMPLE_INTERVAL
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._closed = threading.Event()
+        self._thread = None
+        self._target_id = None
+        self._reset()
+
+    def _reset(self):
+        self._samples = {}
+        self._sample_count = 0
+        self._overhead = 0.0
+        self._wall_start = 0.0
+        self._cpu_start = 0.0
+
+    def begin(self):
+        """开始记录一次运行（需在执行任务的线程中调用）"""
+        with self._lock:
+            self._reset()
+            self._target_id = threading.get_ident()
+            self._wall_start = time.perf_counter()
+            self._cpu_start = time.thread_time()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="OttoPieSampler", daemon=True)
+            self._thread.start()
+        self._active.set()
+
+    def end(self):
+        """
+        结束记录并返回本次运行的统计
+        :return: 字典，包含 wall、cpu、samples、overhead 与按次数排序的 hotspots
+        """
+        self._active.clear()
+        with self._lock:
+            hotspots = sorted(self._samples.items(), key=lambda item: item[1], reverse=True)
+            return {
+                "wall": time.perf_counter() - self._wall_start,
+                "cpu": time.thread_time() - self._cpu_start,
+                "samples": self._sample_count,
+                "overhead": self._overhead,
+                "hotspots": hotspots,
+            }
+
+    def close(self):
+        """停止采样线程"""
+        self._closed.set()
+        self._active.set()
+
+    def _loop(self):
+        while not self._closed.is_set():
+            self._active.wait()
+            if self._closed.is_set():
+                break
+            cost_start = time.thread_time()
+            frame = sys._current_frames().get(self._target_id)
+            if frame is not None:
+                code = frame.f_code
+                key = "{} ({}:{})".format(code.co_name, os.path.basename(code.co_filename), frame.f_lineno)
+                del frame
+                with self._lock:
+                    if self._active.is_set():
+                        self._samples[key] = self._samples.get(key, 0) + 1
+                        self._sample_count += 1
+            cost = time.thread_time() - cost_start
+            with self._lock:
+                self._overhead += cost
+            self.interval = min(max(cost / self.cpu_budget, MIN_SAMPLE_INTERVAL), MAX_SAMPLE_INTERVAL)
+            self._closed.wait(self.interval)
+
+def format_run_stats(stats):
+    """将 RunSampler.end() 的结果格式化为一行日志"""
+    text = "运行耗时 {:.3f}s，CPU {:.3f}s，采样 {} 次，采样开销 {:.2f}ms".format(
+        stats["wall"], stats["cpu"], stats["samples"], stats["overhead"] * 1000)
+    if stats["hotspots"]:
+        name, count = stats["hotspots"][0]
+        text += "，热点 {} {:.0%}".format(name, count / stats["samples"])
+    return text